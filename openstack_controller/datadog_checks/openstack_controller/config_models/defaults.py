@@ -93,7 +93,7 @@ def instance_paginated_limit():
 
 
 def instance_persist_connections():
-    return False
+    return True
 
 
 def instance_request_size():
@@ -107,7 +107,12 @@ class OpenStackControllerCheck(AgentCheck):
 
     HYPERVISOR_CACHE_EXPIRY = 120  # seconds
 
-    HTTP_CONFIG_REMAPPER = {'ssl_verify': {'name': 'tls_verify'}, 'request_timeout': {'name': 'timeout'}}
+    HTTP_CONFIG_REMAPPER = {
+        'ssl_verify': {'name': 'tls_verify'},
+        'request_timeout': {'name': 'timeout'},
+        # Reuse connections across the many Keystone, Nova and Neutron requests made on every run
+        'persist_connections': {'name': 'persist_connections', 'default': True},
+    }
 
     def __init__(self, name, init_config, instances):
         super(OpenStackControllerCheck, self).__init__(name, init_config, instances)
@@ -129,6 +134,8 @@ class OpenStackControllerCheck(AgentCheck):
         self.instance_name = None
         # Mapping of Nova-managed servers to tags for current instance name
         self.external_host_tags = {}
+        # Mapping of hypervisor hostnames to their aggregate, fetched at most once per run
+        self.hypervisor_aggregates = None
 
     def delete_api_cache(self):
         self._api = None
@@ -177,6 +184,10 @@ class OpenStackControllerCheck(AgentCheck):
         return load_averages
 
     def get_all_aggregate_hypervisors(self):
+        # Aggregate tags are looked up for every hypervisor and server, only hit the API once per run
+        if self.hypervisor_aggregates is not None:
+            return self.hypervisor_aggregates
+
         hypervisor_aggregate_map = {}
         try:
             aggregate_list = self.get_os_aggregates()
@@ -191,6 +202,7 @@ class OpenStackControllerCheck(AgentCheck):
             self.warning('Unable to get the list of aggregates: %s', e)
             raise e
 
+        self.hypervisor_aggregates = hypervisor_aggregate_map
         return hypervisor_aggregate_map
 
     def get_loads_for_single_hypervisor(self, hypervisor):
@@ -661,6 +673,7 @@ class OpenStackControllerCheck(AgentCheck):
     def check(self, instance):
         # Initialize global variable that are per instances
         self.external_host_tags = {}
+        self.hypervisor_aggregates = None
         self.instance_name = instance.get('name')
         if not self.instance_name:
             # We need a instance_name to identify this instance
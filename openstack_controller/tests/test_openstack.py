@@ -34,7 +34,7 @@ def test_api_error_log_no_password(check, instance, caplog):
 
     with caplog.at_level(logging.DEBUG):
         with pytest.raises(KeystoneUnreachable):
-            with mock.patch('datadog_checks.base.utils.http.requests.post') as req:
+            with mock.patch('datadog_checks.base.utils.http.requests.Session.post') as req:
                 req.side_effect = HTTPError(mock.Mock(status=404), 'not found')
                 check._api = SimpleApi(check.log, instance.get("keystone_server_url"), check.http)
                 identity = Authenticator._get_user_identity(instance.get("user"))
@@ -359,6 +359,54 @@ def test_collect_server_metrics_pre_2_48(server_diagnostics, os_aggregates, aggr
     aggregator.assert_all_metrics_covered()
 
 
+@mock.patch(
+    'datadog_checks.openstack_controller.OpenStackControllerCheck.get_os_aggregates',
+    return_value=common.EXAMPLE_GET_OS_AGGREGATES_RETURN_VALUE,
+)
+def test_host_aggregate_tags_fetched_once_per_run(os_aggregates):
+    check = OpenStackControllerCheck("test", {}, [common.KEYSTONE_INSTANCE])
+
+    expected_tags = ['aggregate:name', 'availability_zone:london']
+    assert check._get_host_aggregate_tag('compute') == expected_tags
+    assert check._get_host_aggregate_tag('compute.example.com', use_shortname=True) == expected_tags
+    assert check._get_host_aggregate_tag('other') == []
+    assert os_aggregates.call_count == 1
+
+
+@mock.patch('datadog_checks.openstack_controller.api.ApiFactory.create', return_value=mock.MagicMock(AbstractApi))
+@mock.patch(
+    'datadog_checks.openstack_controller.OpenStackControllerCheck.get_os_aggregates',
+    return_value=common.EXAMPLE_GET_OS_AGGREGATES_RETURN_VALUE,
+)
+def test_host_aggregate_tags_refetched_on_next_run(os_aggregates, mock_api):
+    check = OpenStackControllerCheck("test", {}, [common.KEYSTONE_INSTANCE])
+
+    check._get_host_aggregate_tag('compute')
+    assert check.hypervisor_aggregates is not None
+    assert os_aggregates.call_count == 1
+
+    check.check(common.KEYSTONE_INSTANCE)
+    assert check.hypervisor_aggregates is None
+
+    assert check._get_host_aggregate_tag('compute') == ['aggregate:name', 'availability_zone:london']
+    assert os_aggregates.call_count == 2
+
+
+@mock.patch(
+    'datadog_checks.openstack_controller.OpenStackControllerCheck.get_os_aggregates',
+    side_effect=[HTTPError('error'), common.EXAMPLE_GET_OS_AGGREGATES_RETURN_VALUE],
+)
+def test_host_aggregate_tags_failed_fetch_not_cached(os_aggregates):
+    check = OpenStackControllerCheck("test", {}, [common.KEYSTONE_INSTANCE])
+
+    with pytest.raises(HTTPError):
+        check._get_host_aggregate_tag('compute')
+    assert check.hypervisor_aggregates is None
+
+    assert check._get_host_aggregate_tag('compute') == ['aggregate:name', 'availability_zone:london']
+    assert os_aggregates.call_count == 2
+
+
 def test_get_keystone_url_from_openstack_config():
     check = OpenStackControllerCheck(
         "test", {'ssl_verify': False, 'paginated_server_limit': 1}, [common.CONFIG_FILE_INSTANCE]
@@ -410,3 +458,18 @@ def test_config(test_case, extra_config, expected_http_kwargs):
         assert check.http.options[key] == value, "Expected '{}' to be {} but was {}".format(
             key, value, check.http.options[key]
         )
+
+
+@pytest.mark.parametrize(
+    'extra_config, expected_persist_connections',
+    [
+        pytest.param({}, True, id='default'),
+        pytest.param({'persist_connections': False}, False, id='disabled'),
+    ],
+)
+def test_config_persist_connections(extra_config, expected_persist_connections):
+    instance = deepcopy(common.KEYSTONE_INSTANCE)
+    instance.update(extra_config)
+    check = OpenStackControllerCheck('openstack_controller', {}, instances=[instance])
+
+    assert check.http.persist_connections is expected_persist_connections
@@ -3,10 +3,13 @@
 # Licensed under a 3-clause BSD style license (see LICENSE)
 import contextlib
 import datetime
+import heapq
 import inspect
 import threading
 import time
-from typing import Callable, Dict
+from collections import OrderedDict
+from typing import Callable, List, Tuple
+from typing import OrderedDict as OrderedDictType
 
 import psycopg2
 
@@ -21,6 +24,8 @@ class ConnectionPoolFullError(Exception):
 
 
 class ConnectionInfo:
+    __slots__ = ('connection', 'deadline', 'active', 'last_accessed', 'thread', 'persistent')
+
     def __init__(
         self,
         connection: psycopg2.extensions.connection,
@@ -54,6 +59,8 @@ class MultiDatabaseConnectionPool(object):
     """
 
     class Stats(object):
+        __slots__ = ('connection_opened', 'connection_pruned', 'connection_closed', 'connection_closed_failed')
+
         def __init__(self):
             self.connection_opened = 0
             self.connection_pruned = 0
@@ -61,7 +68,7 @@ class MultiDatabaseConnectionPool(object):
             self.connection_closed_failed = 0
 
         def __repr__(self):
-            return str(self.__dict__)
+            return str({name: getattr(self, name) for name in self.__slots__})
 
         def reset(self):
             self.__init__()
@@ -70,7 +77,13 @@ class MultiDatabaseConnectionPool(object):
         self.max_conns: int = max_conns
         self._stats = self.Stats()
         self._mu = threading.RLock()
-        self._conns: Dict[str, ConnectionInfo] = {}
+        # Notified whenever a connection is released or closed, i.e. whenever a slot may be freed in the pool
+        self._slot_free = threading.Condition(self._mu)
+        # Kept in least-recently-used order: connections are popped and re-inserted every time they are handed out
+        self._conns: OrderedDictType[str, ConnectionInfo] = OrderedDict()
+        # Min-heap of (deadline, dbname) used to find expired connections without scanning the whole pool.
+        # Entries whose deadline no longer matches the pooled connection are stale and skipped when popped.
+        self._deadlines: List[Tuple[datetime.datetime, str]] = []
 
         if hasattr(inspect, 'signature'):
             connect_sig = inspect.signature(connect_fn)
@@ -94,21 +107,17 @@ class MultiDatabaseConnectionPool(object):
         Pass a function to startup_func if there is an action needed with the connection
         when re-establishing it.
         """
-        start = datetime.datetime.now()
+        start = time.monotonic()
         self.prune_connections()
         with self._mu:
             conn = self._conns.pop(dbname, None)
             db = conn.connection if conn else None
+            if (db is None or db.closed) and self.max_conns is not None:
+                self._wait_for_free_slot(start, timeout)
+                # the lock is released while waiting, another thread may have connected to this database meanwhile
+                conn = self._conns.pop(dbname, conn)
+                db = conn.connection if conn else None
             if db is None or db.closed:
-                if self.max_conns is not None:
-                    # try to free space until we succeed
-                    while len(self._conns) >= self.max_conns:
-                        self.prune_connections()
-                        self.evict_lru()
-                        if timeout is not None and (datetime.datetime.now() - start).total_seconds() > timeout:
-                            raise ConnectionPoolFullError(self.max_conns, timeout)
-                        time.sleep(0.01)
-                        continue
                 self._stats.connection_opened += 1
                 db = self.connect_fn(dbname)
                 if startup_fn:
@@ -121,17 +130,46 @@ class MultiDatabaseConnectionPool(object):
                 # Some transaction went wrong and the connection is in an unhealthy state. Let's fix that
                 db.rollback()
 
-            deadline = datetime.datetime.now() + datetime.timedelta(milliseconds=ttl_ms)
+            now = datetime.datetime.now()
+            deadline = now + datetime.timedelta(milliseconds=ttl_ms)
             self._conns[dbname] = ConnectionInfo(
                 connection=db,
                 deadline=deadline,
                 active=True,
-                last_accessed=datetime.datetime.now(),
+                last_accessed=now,
                 thread=threading.current_thread(),
                 persistent=persistent,
             )
+            self._push_deadline(deadline, dbname)
             return db
 
+    def _wait_for_free_slot(self, start: float, timeout: int = None):
+        """
+        Block until the pool has room for a new connection, evicting inactive connections when possible.
+        Must be called with the lock held, which is released while waiting for a connection to be released.
+        """
+        while len(self._conns) >= self.max_conns:
+            self.prune_connections()
+            if self.evict_lru() is not None:
+                continue
+            wait_time = None
+            if timeout is not None:
+                wait_time = timeout - (time.monotonic() - start)
+                if wait_time <= 0:
+                    raise ConnectionPoolFullError(self.max_conns, timeout)
+            if self._deadlines:
+                # wake up in time to prune the next connection reaching its deadline
+                until_deadline = (self._deadlines[0][0] - datetime.datetime.now()).total_seconds()
+                wait_time = until_deadline if wait_time is None else min(wait_time, until_deadline)
+            self._slot_free.wait(wait_time)
+
+    def _push_deadline(self, deadline: datetime.datetime, dbname: str):
+        heapq.heappush(self._deadlines, (deadline, dbname))
+        # Connections handed out repeatedly leave stale entries behind; rebuild the heap once they dominate it
+        if len(self._deadlines) > 2 * len(self._conns):
+            self._deadlines = [(conn.deadline, name) for name, conn in self._conns.items()]
+            heapq.heapify(self._deadlines)
+
     @contextlib.contextmanager
     def get_connection(
         self,
@@ -150,17 +188,19 @@ class MultiDatabaseConnectionPool(object):
         Note that leaving a connection context here does NOT close the connection in psycopg2;
         connections must be manually closed by `close_all_connections()`.
         """
+        conn_info = None
         try:
             with self._mu:
                 db = self._get_connection_raw(dbname, ttl_ms, timeout, startup_fn, persistent)
+                conn_info = self._conns[dbname]
             yield db
         finally:
-            with self._mu:
-                try:
-                    self._conns[dbname].active = False
-                except KeyError:
-                    # if self._get_connection_raw hit an exception, self._conns[dbname] didn't get populated
-                    pass
+            # if self._get_connection_raw hit an exception, there is no connection to release
+            if conn_info is not None:
+                with self._mu:
+                    # release the entry installed for this caller, not one another thread may have replaced it with
+                    conn_info.active = False
+                    self._slot_free.notify()
 
     def prune_connections(self):
         """
@@ -172,8 +212,10 @@ class MultiDatabaseConnectionPool(object):
         """
         with self._mu:
             now = datetime.datetime.now()
-            for dbname, conn in list(self._conns.items()):
-                if conn.deadline < now:
+            while self._deadlines and self._deadlines[0][0] < now:
+                deadline, dbname = heapq.heappop(self._deadlines)
+                conn = self._conns.get(dbname)
+                if conn is not None and conn.deadline == deadline:
                     self._stats.connection_pruned += 1
                     self._terminate_connection_unsafe(dbname)
 
@@ -184,6 +226,8 @@ class MultiDatabaseConnectionPool(object):
                 dbname = next(iter(self._conns))
                 if not self._terminate_connection_unsafe(dbname):
                     success = False
+            # every tracked deadline now belongs to a closed connection
+            self._deadlines.clear()
         return success
 
     def evict_lru(self) -> str:
@@ -192,8 +236,7 @@ class MultiDatabaseConnectionPool(object):
         Return the dbname connection that was evicted or None if we couldn't evict a connection.
         """
         with self._mu:
-            sorted_conns = sorted(self._conns.items(), key=lambda i: i[1].last_accessed)
-            for name, conn_info in sorted_conns:
+            for name, conn_info in self._conns.items():
                 if not conn_info.active and not conn_info.persistent:
                     self._terminate_connection_unsafe(name)
                     return name
@@ -203,6 +246,7 @@ class MultiDatabaseConnectionPool(object):
 
     def _terminate_connection_unsafe(self, dbname: str):
         db = self._conns.pop(dbname, ConnectionInfo(None, None, None, None, None, None)).connection
+        self._slot_free.notify()
         if db is not None:
             try:
                 self._stats.connection_closed += 1
@@ -7,6 +7,7 @@ import threading
 import time
 import uuid
 
+import mock
 import psycopg2
 import pytest
 
@@ -17,6 +18,10 @@ from .common import HOST, PASSWORD_ADMIN, USER_ADMIN
 from .utils import _get_superconn
 
 
+def _mock_connect(dbname):
+    return mock.MagicMock(closed=False, status=psycopg2.extensions.STATUS_READY)
+
+
 @pytest.mark.integration
 @pytest.mark.usefixtures('dd_environment')
 def test_conn_pool(pg_instance):
@@ -272,6 +277,142 @@ def test_conn_pool_single_context(pg_instance):
         pass
 
 
+@pytest.mark.unit
+def test_conn_pool_evict_lru_order():
+    """
+    Test that eviction picks the least recently handed out connection, skipping active and persistent ones.
+    """
+
+    pool = MultiDatabaseConnectionPool(_mock_connect)
+    with pool.get_connection('dogs_0', 60000, persistent=True):
+        pass
+    for dbname in ('dogs_1', 'dogs_2', 'dogs_3'):
+        with pool.get_connection(dbname, 60000):
+            pass
+    # touch dogs_1 again so that it becomes the most recently used
+    with pool.get_connection('dogs_1', 60000):
+        pass
+    pool._conns['dogs_2'].active = True
+
+    assert pool.evict_lru() == 'dogs_3'
+    assert pool.evict_lru() == 'dogs_1'
+    assert pool.evict_lru() is None
+    assert list(pool._conns) == ['dogs_0', 'dogs_2']
+    assert pool._stats.connection_closed == 2
+
+
+@pytest.mark.unit
+def test_conn_pool_prune_uses_latest_deadline():
+    """
+    Test that pruning only closes connections whose most recent deadline has passed.
+    """
+
+    pool = MultiDatabaseConnectionPool(_mock_connect)
+    start = datetime.datetime(2023, 1, 1)
+    with mock.patch('datadog_checks.postgres.connections.datetime') as mock_datetime:
+        mock_datetime.timedelta = datetime.timedelta
+        mock_datetime.datetime.now.return_value = start
+        with pool.get_connection('dogs_0', 1000):
+            pass
+        with pool.get_connection('dogs_1', 1000):
+            pass
+
+        # renewing the connection with a longer ttl must supersede its earlier deadline
+        renewed_at = start + datetime.timedelta(milliseconds=500)
+        mock_datetime.datetime.now.return_value = renewed_at
+        with pool.get_connection('dogs_0', 60000):
+            pass
+        assert len(pool._deadlines) == 3
+
+        # both original deadlines are now in the past, only the renewed one is not
+        mock_datetime.datetime.now.return_value = start + datetime.timedelta(seconds=2)
+        pool.prune_connections()
+
+    assert list(pool._conns) == ['dogs_0']
+    assert pool._conns['dogs_0'].deadline == renewed_at + datetime.timedelta(milliseconds=60000)
+    assert pool._deadlines == [(renewed_at + datetime.timedelta(milliseconds=60000), 'dogs_0')]
+    assert pool._stats.connection_pruned == 1
+    assert pool._stats.connection_closed == 1
+    assert pool._stats.connection_opened == 2
+
+    assert pool.close_all_connections()
+    assert len(pool._conns) == 0
+    assert len(pool._deadlines) == 0
+
+
+@pytest.mark.unit
+def test_conn_pool_full_waits_for_release():
+    """
+    Test that a caller blocked on a full pool is woken up as soon as another thread releases its connection.
+    """
+
+    pool = MultiDatabaseConnectionPool(_mock_connect, 1)
+    acquired = threading.Event()
+
+    def hold_connection():
+        with pool.get_connection('dogs_0', 60000):
+            acquired.set()
+            time.sleep(0.5)
+
+    thread = threading.Thread(target=hold_connection)
+    thread.start()
+    assert acquired.wait(5)
+
+    with pytest.raises(ConnectionPoolFullError):
+        with pool.get_connection('dogs_1', 60000, 0.1):
+            pass
+
+    with pool.get_connection('dogs_1', 60000, 5):
+        pass
+    thread.join(5)
+    assert not thread.is_alive()
+
+    assert list(pool._conns) == ['dogs_1']
+    assert pool._stats.connection_closed == 1
+
+
+@pytest.mark.unit
+def test_conn_pool_release_own_entry():
+    """
+    Test that leaving a connection context only releases the pool entry handed out to that caller.
+    """
+    pool = MultiDatabaseConnectionPool(_mock_connect)
+    first = pool.get_connection('dogs_0', 60000)
+    second = pool.get_connection('dogs_0', 60000)
+
+    first.__enter__()
+    first_info = pool._conns['dogs_0']
+    second.__enter__()
+    second_info = pool._conns['dogs_0']
+    assert second_info is not first_info
+
+    first.__exit__(None, None, None)
+    assert pool._conns['dogs_0'] is second_info
+    assert second_info.active
+
+    second.__exit__(None, None, None)
+    assert not second_info.active
+
+
+@pytest.mark.unit
+def test_conn_pool_failed_acquire_leaves_entry_untouched():
+    """
+    Test that an error while grabbing a connection does not release the entry held by another caller.
+    """
+    pool = MultiDatabaseConnectionPool(_mock_connect)
+    with pool.get_connection('dogs_0', 60000):
+        conn_info = pool._conns['dogs_0']
+        with mock.patch.object(pool, '_get_connection_raw', side_effect=psycopg2.OperationalError):
+            with pytest.raises(psycopg2.OperationalError):
+                with pool.get_connection('dogs_0', 60000):
+                    pass
+
+        assert pool._conns['dogs_0'] is conn_info
+        assert conn_info.active
+
+    assert not conn_info.active
+
+
 @pytest.mark.integration
 @pytest.mark.usefixtures('dd_environment')
 def test_conn_pool_context_managed(pg_instance):